@@ -4,6 +4,7 @@ from pathlib import Path
 
 import pytest
 
+from util import project_file_packer
 from util.project_file_packer import ProjectFilePacker, FilePackError, StorageError
 
 
@@ -88,6 +89,231 @@ def test_json2file_with_json_string(tmp_path: Path, packer):
     assert _read_zip_text(zip_path, f"{project_name}/dir/b.txt") == "B\n"
 
 
+def test_json2file_debug_keep_tmp_keeps_project_dir(tmp_path: Path, packer):
+    file_path = tmp_path / "work"
+    out_path = tmp_path / "out"
+    project_name = "demo"
+
+    result = packer.json2file(
+        file_map={"src/main.py": "print('hello')\n", "README.md": "# Demo\n"},
+        file_path=str(file_path),
+        output_path=str(out_path),
+        project_name=project_name,
+        debug_keep_tmp=True,
+    )
+    zip_path = Path(result["zip_path"])
+
+    # 调试模式下保留临时目录
+    assert (file_path / project_name / "src" / "main.py").read_text(encoding="utf-8") == "print('hello')\n"
+    assert _zip_namelist(zip_path) == [f"{project_name}/README.md", f"{project_name}/src/main.py"]
+    assert _read_zip_text(zip_path, f"{project_name}/src/main.py") == "print('hello')\n"
+
+
+def test_json2file_debug_keep_tmp_orders_members_by_name(tmp_path: Path, packer):
+    result = packer.json2file(
+        file_map={"c.txt": "c", "b/x.txt": "x", "a/z/w.txt": "w", "a/y.txt": "y"},
+        file_path=str(tmp_path / "work"),
+        output_path=str(tmp_path / "out"),
+        project_name="p",
+        debug_keep_tmp=True,
+    )
+
+    # 不依赖 scandir 返回顺序：每个目录内先文件后子目录，均按名称排序
+    with zipfile.ZipFile(result["zip_path"], "r") as zf:
+        assert zf.namelist() == ["p/c.txt", "p/a/y.txt", "p/a/z/w.txt", "p/b/x.txt"]
+
+
+def test_json2file_debug_keep_tmp_recreates_stale_project_dir(tmp_path: Path, packer):
+    file_path = tmp_path / "work"
+    stale = file_path / "demo" / "old" / "stale.txt"
+    stale.parent.mkdir(parents=True)
+    stale.write_text("stale", encoding="utf-8")
+
+    result = packer.json2file(
+        file_map={"a.txt": "A\n"},
+        file_path=str(file_path),
+        output_path=str(tmp_path / "out"),
+        project_name="demo",
+        debug_keep_tmp=True,
+    )
+
+    assert not (file_path / "demo" / "old").exists()
+    assert _zip_namelist(Path(result["zip_path"])) == ["demo/a.txt"]
+
+
+def test_json2file_debug_keep_tmp_refuses_symlinked_project_dir(tmp_path: Path, packer):
+    victim = tmp_path / "victim"
+    (victim / "sub").mkdir(parents=True)
+    (victim / "keep.txt").write_text("keep", encoding="utf-8")
+    (victim / "sub" / "keep2.txt").write_text("keep2", encoding="utf-8")
+
+    file_path = tmp_path / "work"
+    file_path.mkdir()
+    (file_path / "demo").symlink_to(victim, target_is_directory=True)
+
+    with pytest.raises(OSError):
+        packer.json2file(
+            file_map={"a.txt": "A\n"},
+            file_path=str(file_path),
+            output_path=str(tmp_path / "out"),
+            project_name="demo",
+            debug_keep_tmp=True,
+        )
+
+    # 链接目标中的内容不应被删除
+    assert (victim / "keep.txt").read_text(encoding="utf-8") == "keep"
+    assert (victim / "sub" / "keep2.txt").read_text(encoding="utf-8") == "keep2"
+
+
+def test_json2file_stores_tiny_files_and_deflates_larger_ones(tmp_path: Path, packer):
+    big = "print('hello')\n" * 100
+    result = packer.json2file(
+        file_map={"tiny.txt": "x\n", "big.py": big},
+        file_path=str(tmp_path / "work"),
+        output_path=str(tmp_path / "out"),
+        project_name="p",
+    )
+    zip_path = Path(result["zip_path"])
+
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        assert zf.getinfo("p/tiny.txt").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("p/big.py").compress_type == zipfile.ZIP_DEFLATED
+    assert _read_zip_text(zip_path, "p/big.py") == big
+
+
+def test_json2file_zip_has_no_trailing_preallocated_bytes(tmp_path: Path, packer):
+    # 内容高度可压缩，实际 zip 远小于预分配的大小
+    result = packer.json2file(
+        file_map={"a.txt": "a" * 100_000, "b.txt": "b\n"},
+        file_path=str(tmp_path / "work"),
+        output_path=str(tmp_path / "out"),
+        project_name="p",
+    )
+    data = Path(result["zip_path"]).read_bytes()
+
+    assert len(data) < 10_000
+    assert data[-22:-18] == b"PK\x05\x06"
+    assert _read_zip_text(Path(result["zip_path"]), "p/a.txt") == "a" * 100_000
+
+
+@pytest.mark.parametrize("debug_keep_tmp", [False, True])
+def test_json2file_writes_no_data_descriptors(tmp_path: Path, packer, debug_keep_tmp: bool):
+    # STORED + data descriptor 会被部分流式读取器（如 Java ZipInputStream）拒绝
+    result = packer.json2file(
+        file_map={"t.txt": "t\n", "big.py": "x = 1\n" * 100},
+        file_path=str(tmp_path / "work"),
+        output_path=str(tmp_path / "out"),
+        project_name="p",
+        debug_keep_tmp=debug_keep_tmp,
+    )
+
+    with zipfile.ZipFile(result["zip_path"], "r") as zf:
+        assert zf.getinfo("p/t.txt").compress_type == zipfile.ZIP_STORED
+        for info in zf.infolist():
+            assert info.flag_bits & 0x08 == 0
+
+
+def test_json2file_serial_streams_records(tmp_path: Path, packer, monkeypatch):
+    # 未开启并行时不应先把全部压缩结果收集到列表里
+    def no_batch(entries):
+        raise AssertionError("serial path must not batch-deflate entries")
+
+    monkeypatch.setattr(packer, "_deflate_entries", no_batch)
+    file_map = {f"f{i}.txt": f"{i}\n" * 500 for i in range(20)}
+
+    result = packer.json2file(file_map, str(tmp_path / "work"), str(tmp_path / "out"), "p")
+    with zipfile.ZipFile(result["zip_path"], "r") as zf:
+        assert zf.testzip() is None
+        assert zf.read("p/f3.txt").decode("utf-8") == file_map["f3.txt"]
+
+
+@pytest.mark.parametrize("debug_keep_tmp", [False, True])
+def test_json2file_writes_zip64_when_limits_exceeded(tmp_path: Path, packer, monkeypatch, debug_keep_tmp: bool):
+    # 调低阈值，用小数据覆盖 zip64 扩展字段与 zip64 结束记录
+    monkeypatch.setattr(project_file_packer, "_ZIP64_LIMIT", 100)
+    monkeypatch.setattr(project_file_packer, "_ZIP_FILECOUNT_LIMIT", 2)
+    file_map = {"a.txt": "a" * 500, "b.txt": "b\n", "c/big.bin": "0123456789" * 300}
+
+    result = packer.json2file(
+        file_map, str(tmp_path / "work"), str(tmp_path / "out"), "p", debug_keep_tmp=debug_keep_tmp
+    )
+    data = Path(result["zip_path"]).read_bytes()
+
+    assert b"PK\x06\x06" in data and b"PK\x06\x07" in data
+    with zipfile.ZipFile(result["zip_path"], "r") as zf:
+        assert zf.testzip() is None
+        for rel, content in file_map.items():
+            assert zf.getinfo(f"p/{rel}").file_size == len(content)
+            assert zf.read(f"p/{rel}").decode("utf-8") == content
+
+
+def test_json2file_removes_partial_zip_on_write_error(tmp_path: Path, packer, monkeypatch):
+    def broken_write(fp, records):
+        fp.write(b"PK\x03\x04partial")
+        raise RuntimeError("disk error")
+
+    monkeypatch.setattr(packer, "_write_raw_zip", broken_write)
+    out_path = tmp_path / "out"
+
+    with pytest.raises(RuntimeError):
+        packer.json2file({"a.txt": "A\n" * 1000}, str(tmp_path / "work"), str(out_path), "p")
+
+    assert not (out_path / "p.zip").exists()
+
+
+@pytest.mark.parametrize("debug_keep_tmp", [False, True])
+def test_json2file_is_reproducible(tmp_path: Path, packer, debug_keep_tmp: bool):
+    file_map = {"src/main.py": "print('hello')\n" * 10, "README.md": "# Demo\n"}
+
+    first = packer.json2file(
+        file_map, str(tmp_path / "work1"), str(tmp_path / "out1"), "demo", debug_keep_tmp=debug_keep_tmp
+    )
+    second = packer.json2file(
+        file_map, str(tmp_path / "work2"), str(tmp_path / "out2"), "demo", debug_keep_tmp=debug_keep_tmp
+    )
+
+    assert Path(first["zip_path"]).read_bytes() == Path(second["zip_path"]).read_bytes()
+    with zipfile.ZipFile(first["zip_path"], "r") as zf:
+        info = zf.getinfo("demo/src/main.py")
+        assert info.date_time == (1980, 1, 1, 0, 0, 0)
+        assert (info.external_attr >> 16) & 0o777 == 0o644
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_json2file_parallel_matches_serial(tmp_path: Path, backend: str):
+    file_map = {f"src/m{i}.py": f"# 模块 {i}\n" + "x = 1\n" * (i * 40) for i in range(20)}
+    file_map["tiny.txt"] = "t\n"
+
+    serial = ProjectFilePacker().json2file(file_map, str(tmp_path / "work"), str(tmp_path / "s"), "p")
+    parallel = ProjectFilePacker(parallel_workers=2, parallel_backend=backend).json2file(
+        file_map, str(tmp_path / "work"), str(tmp_path / "par"), "p"
+    )
+
+    with zipfile.ZipFile(serial["zip_path"], "r") as zs, zipfile.ZipFile(parallel["zip_path"], "r") as zp:
+        assert zp.testzip() is None
+        assert zp.namelist() == zs.namelist()
+        for name in zs.namelist():
+            assert zp.read(name) == zs.read(name)
+            assert zp.getinfo(name).compress_type == zs.getinfo(name).compress_type
+            assert zp.getinfo(name).external_attr == zs.getinfo(name).external_attr
+
+
+def test_json2file_parallel_with_store_threshold_above_parallel_min_size(tmp_path: Path):
+    class BigStorePacker(ProjectFilePacker):
+        ZIP_STORE_BELOW = 4096
+
+    # 一部分文件既达到 PARALLEL_MIN_SIZE 又低于 ZIP_STORE_BELOW，应直接 STORED 且不打乱其余结果
+    file_map = {f"d/f{i}": f"{i}\n" * (i * 150) for i in range(20)}
+    result = BigStorePacker(parallel_workers=2).json2file(
+        file_map, str(tmp_path / "work"), str(tmp_path / "out"), "p"
+    )
+
+    with zipfile.ZipFile(result["zip_path"], "r") as zf:
+        assert zf.testzip() is None
+        for rel, content in file_map.items():
+            assert zf.read(f"p/{rel}").decode("utf-8") == content
+
+
 def test_json2file_overwrites_existing_zip(tmp_path: Path, packer):
     file_path = tmp_path / "work"
     out_path = tmp_path / "out"
@@ -134,6 +360,10 @@ def test_json2file_rejects_bad_project_name(tmp_path: Path, packer, bad_project_
         "/abs/path.txt",
         r"C:\abs\path.txt",
         "dir/../../evil.txt",
+        "\\abs\\path.txt",
+        "dir//evil.txt",
+        ".",
+        "",
     ],
 )
 def test_json2file_rejects_path_traversal_in_keys(tmp_path: Path, packer, bad_key: str):
@@ -149,6 +379,40 @@ def test_json2file_rejects_path_traversal_in_keys(tmp_path: Path, packer, bad_ke
         )
 
 
+def test_json2file_normalizes_backslash_keys(tmp_path: Path, packer):
+    result = packer.json2file(
+        file_map={r"src\util\a.py": "A\n"},
+        file_path=str(tmp_path / "work"),
+        output_path=str(tmp_path / "out"),
+        project_name="p",
+    )
+    assert _zip_namelist(Path(result["zip_path"])) == ["p/src/util/a.py"]
+
+
+@pytest.mark.parametrize("debug_keep_tmp", [False, True])
+@pytest.mark.parametrize(
+    "file_map",
+    [
+        {"a/b.txt": "1", "./a/b.txt": "2", "a\\b.txt": "3"},
+        # 同一路径既是文件又是目录（两种顺序）
+        {"a": "file", "a/b": "child"},
+        {"a/b": "child", "a": "file"},
+        {"a": "file", "a/b/c": "grandchild"},
+    ],
+)
+def test_json2file_rejects_keys_colliding_after_normalization(
+    tmp_path: Path, packer, debug_keep_tmp: bool, file_map: dict
+):
+    with pytest.raises(FilePackError):
+        packer.json2file(
+            file_map=file_map,
+            file_path=str(tmp_path / "work"),
+            output_path=str(tmp_path / "out"),
+            project_name="p",
+            debug_keep_tmp=debug_keep_tmp,
+        )
+
+
 def test_json2file_rejects_non_string_values(tmp_path: Path, packer):
     file_path = tmp_path / "work"
     out_path = tmp_path / "out"
@@ -162,6 +426,26 @@ def test_json2file_rejects_non_string_values(tmp_path: Path, packer):
         )
 
 
+def test_json2file_trust_input_still_rejects_path_traversal(tmp_path: Path, packer):
+    result = packer.json2file(
+        file_map={"a.txt": "A\n"},
+        file_path=str(tmp_path / "work"),
+        output_path=str(tmp_path / "out"),
+        project_name="p",
+        trust_input=True,
+    )
+    assert _read_zip_text(Path(result["zip_path"]), "p/a.txt") == "A\n"
+
+    with pytest.raises(FilePackError):
+        packer.json2file(
+            file_map={"../evil.txt": "boom"},
+            file_path=str(tmp_path / "work"),
+            output_path=str(tmp_path / "out"),
+            project_name="p",
+            trust_input=True,
+        )
+
+
 def test_json2file_rejects_invalid_json(tmp_path: Path, packer):
     file_path = tmp_path / "work"
     out_path = tmp_path / "out"
@@ -175,6 +459,12 @@ def test_json2file_rejects_invalid_json(tmp_path: Path, packer):
         )
 
 
+@pytest.mark.parametrize("kwargs", [{"compress_level": 12}, {"compress_level": -2}, {"parallel_backend": "gpu"}])
+def test_packer_rejects_invalid_options(kwargs: dict):
+    with pytest.raises(ValueError):
+        ProjectFilePacker(**kwargs)
+
+
 def test_file2storage_returns_file_url(tmp_path: Path, packer):
     f = tmp_path / "a.zip"
     f.write_bytes(b"abc")
@@ -184,6 +474,15 @@ def test_file2storage_returns_file_url(tmp_path: Path, packer):
     assert result["url"].startswith("file://")
 
 
+def test_file2storage_quotes_special_chars(tmp_path: Path, packer):
+    f = tmp_path / "my project#1" / "a.zip"
+    f.parent.mkdir()
+    f.write_bytes(b"abc")
+
+    url = packer.file2storage(str(f))["url"]
+    assert url.endswith("/my%20project%231/a.zip")
+
+
 def test_file2storage_raises_when_missing(tmp_path: Path, packer):
     missing = tmp_path / "missing.zip"
     with pytest.raises(StorageError):
@@ -1,17 +1,62 @@
 from __future__ import annotations
 
+import io
 import json
 import os
-import shutil
+import re
+import struct
 import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Dict, Union, Optional
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from urllib.parse import quote
 
+try:  # orjson 为可选依赖：解析大体积 json 明显更快，缺失时回退标准库
+    import orjson
+
+    _JSON_LOADS = orjson.loads
+except ImportError:
+    _JSON_LOADS = json.loads
+
 
 FileMapInput = Union[str, Dict[str, str]]
 
+# 不安全的相对路径：绝对路径/盘符开头、'..' 段、连续分隔符（/ 与 \ 同等对待）
+_BAD_REL = re.compile(r"^(?:[\\/]|[A-Za-z]:)|(?:^|[\\/])\.\.(?:[\\/]|$)|[\\/]{2,}")
+# 不安全的项目名：包含路径分隔符或 '..'
+_BAD_NAME = re.compile(r"[\\/]|\.\.")
+
+# quote(p) 不会转义的字符（unreserved + '/'），用于 file:// URL 快路径
+_URL_SAFE_PATH = re.compile(r"[A-Za-z0-9_.~/-]*")
+
+# next() 查找不合法项时的哨兵
+_SENTINEL = object()
+
+# 预压缩写 zip 时使用的头部结构
+_LOCAL_HEADER = struct.Struct("<4sHHHHHLLLHH")
+_CENTRAL_HEADER = struct.Struct("<4sHHHHHHLLLHHHHHLL")
+_END_RECORD = struct.Struct("<4sHHHHLLH")
+_ZIP64_END_RECORD = struct.Struct("<4sQHHLLQQQQ")
+_ZIP64_END_LOCATOR = struct.Struct("<4sLQL")
+# 超过以下限制时写 zip64 扩展字段/结束记录（与 zipfile 判断一致）
+_ZIP64_LIMIT = zipfile.ZIP64_LIMIT
+_ZIP_FILECOUNT_LIMIT = zipfile.ZIP_FILECOUNT_LIMIT
+# 固定 mtime 1980-01-01 00:00:00 的 DOS 时间/日期
+_DOS_TIME, _DOS_DATE = 0, (1 << 5) | 1
+
+# (arcname, 原始大小, CRC32, 压缩方式, 压缩后数据)
+ZipRecord = Tuple[str, int, int, int, bytes]
+
+
+def _raw_deflate(data: bytes, level: int) -> bytes:
+    """生成 zip 所需的原始 DEFLATE 流（无 zlib 头尾）。模块级函数以便子进程 pickle。"""
+    c = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return c.compress(data) + c.flush()
+
 
 class FilePackError(Exception):
     """打包/落盘相关错误。"""
@@ -21,15 +66,15 @@ class StorageError(Exception):
     """存储相关错误。"""
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PackResult:
-    """json2file 的返回结构。"""
+    """json2file 的返回结构（仅作说明，热路径直接返回等价 dict）。"""
     zip_path: str  # 生成的zip完整路径
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class StorageResult:
-    """file2storage 的返回结构。"""
+    """file2storage 的返回结构（仅作说明，热路径直接返回等价 dict）。"""
     url: str  # 存储对象的访问地址
 
 
@@ -38,6 +83,42 @@ class ProjectFilePacker:
     将 file_map (json字符串/dict) 写入到项目目录中，并打包为 zip。
     """
 
+    # zip 输出缓冲区大小：合并 deflate 产生的小块写入，减少 write 系统调用
+    ZIP_WRITE_BUF = 1 << 20
+    # 小于该字节数的文件直接 STORED：deflate 头部开销大于压缩收益
+    ZIP_STORE_BELOW = 64
+    # 不小于该字节数的文件落盘时绕过 BufferedWriter 直接写入
+    UNBUFFERED_WRITE_MIN = 64 * 1024
+    # 并行压缩：文件数达到该值才启用，且只有不小于 PARALLEL_MIN_SIZE 的文件交给线程/进程池
+    PARALLEL_MIN_ENTRIES = 16
+    PARALLEL_MIN_SIZE = 1024
+    PARALLEL_EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+    def __init__(
+        self,
+        compress_level: int = 1,
+        parallel_workers: int = 0,
+        parallel_backend: str = "thread",
+    ) -> None:
+        """
+        compress_level: DEFLATE 压缩级别（0-9，-1 为 zlib 默认）。源码类小文本用 1 即可，
+        速度远快于 zlib 默认的 6，体积仅略大。
+        parallel_workers: 并行压缩的 worker 数，0 表示关闭（默认），-1 表示 os.cpu_count()。
+        parallel_backend: "thread"（默认）或 "process"。zlib 压缩时会释放 GIL，
+        线程即可并行且没有进程间序列化开销；使用 "process" 时调用方在
+        Windows/macOS 上需放在 `if __name__ == "__main__":` 下。
+        """
+        if not -1 <= compress_level <= 9:
+            raise ValueError(f"compress_level must be between -1 and 9, got {compress_level}")
+        if parallel_backend not in self.PARALLEL_EXECUTORS:
+            raise ValueError(f"parallel_backend must be one of {sorted(self.PARALLEL_EXECUTORS)}")
+        if parallel_workers < 0:
+            parallel_workers = os.cpu_count() or 1
+
+        self.compress_level = compress_level
+        self.parallel_workers = parallel_workers
+        self.parallel_backend = parallel_backend
+
     # ---------------------------
     # Public APIs
     # ---------------------------
@@ -48,42 +129,53 @@ class ProjectFilePacker:
         file_path: str,
         output_path: str,
         project_name: str,
+        debug_keep_tmp: bool = False,
+        trust_input: bool = False,
     ) -> Dict[str, str]:
         """
-        根据 file_map 在 file_path/project_name 下创建文件结构并写入内容；
-        最终打包到 output_path 下的 zip 文件，并清理临时目录。
+        根据 file_map 直接在内存中打包为 output_path 下的 zip 文件（zip 内部路径从 project_name 开始）。
+        debug_keep_tmp=True 时，会先在 file_path/project_name 下落盘文件结构再打包，
+        并保留该目录便于调试。
+        trust_input=True 且 file_map 为 dict 时，跳过 key/value 类型校验，
+        由调用方保证均为 str（路径安全校验仍会执行）。
         返回：{"zip_path": "..."}  (完整路径)
         """
-        file_map_dict = self._parse_file_map(file_map)
+        if trust_input and isinstance(file_map, dict):
+            file_map_dict = file_map
+        else:
+            file_map_dict = self._parse_file_map(file_map)
         self._validate_project_name(project_name)
 
-        base_dir = Path(file_path).expanduser().resolve()
         out_dir = Path(output_path).expanduser().resolve()
-        tmp_project_dir = base_dir / project_name
+        self._ensure_dir(out_dir)
 
+        if not debug_keep_tmp:
+            zip_full_path = self._zip_from_map(
+                file_map_dict=file_map_dict,
+                out_dir=out_dir,
+                project_name=project_name,
+            )
+            return {"zip_path": str(zip_full_path)}
+
+        # 调试模式：落盘到 file_path/project_name，打包后保留目录
+        base_dir = Path(file_path).expanduser().resolve()
+        tmp_project_dir = base_dir / project_name
         self._ensure_dir(base_dir)
-        self._ensure_dir(out_dir)
 
-        zip_full_path: Optional[Path] = None
-        try:
-            # 1) 创建/清空临时项目目录
-            self._recreate_dir(tmp_project_dir)
+        # 1) 创建/清空临时项目目录
+        self._recreate_dir(tmp_project_dir)
 
-            # 2) 写入文件结构
-            self._write_files(tmp_project_dir, file_map_dict)
+        # 2) 写入文件结构
+        self._write_files(tmp_project_dir, file_map_dict)
 
-            # 3) 打包为 zip
-            zip_full_path = self._make_zip(
-                src_dir=tmp_project_dir,
-                out_dir=out_dir,
-                zip_name=f"{project_name}.zip",
-            )
+        # 3) 打包为 zip
+        zip_full_path = self._make_zip(
+            src_dir=tmp_project_dir,
+            out_dir=out_dir,
+            zip_name=f"{project_name}.zip",
+        )
 
-            return PackResult(zip_path=str(zip_full_path)).__dict__
-        finally:
-            # 4) 清理临时目录（不影响 zip）
-            # 若需要保留调试，可在此处加开关
-            self._safe_remove_dir(tmp_project_dir)
+        return {"zip_path": str(zip_full_path)}
 
     def file2storage(self, file_path: str) -> Dict[str, str]:
         """
@@ -96,7 +188,7 @@ class ProjectFilePacker:
             raise StorageError(f"File not found or not a file: {p}")
 
         url = self._to_file_url(p)
-        return StorageResult(url=url).__dict__
+        return {"url": url}
 
     # ---------------------------
     # Parsing & Validation
@@ -109,8 +201,8 @@ class ProjectFilePacker:
 
         if isinstance(file_map, str):
             try:
-                obj = json.loads(file_map)
-            except json.JSONDecodeError as e:
+                obj = _JSON_LOADS(file_map)
+            except json.JSONDecodeError as e:  # orjson.JSONDecodeError 是其子类
                 raise FilePackError(f"Invalid json string: {e}") from e
             if not isinstance(obj, dict):
                 raise FilePackError("file_map json must be an object (dict).")
@@ -120,47 +212,74 @@ class ProjectFilePacker:
 
     def _ensure_str_str_dict(self, d: dict) -> Dict[str, str]:
         """确保 dict 的 key/value 都是 str。"""
-        out: Dict[str, str] = {}
-        for k, v in d.items():
-            if not isinstance(k, str):
-                raise FilePackError(f"file_map key must be str, got {type(k)}: {k}")
-            if not isinstance(v, str):
-                # 内容也可以改成支持 bytes/None 等，这里按需求严格 str
-                raise FilePackError(f"file_map value must be str, got {type(v)}: {k}")
-            out[k] = v
-        return out
+        keys = list(d.keys())
+        vals = list(d.values())
+
+        # type(x) is str 命中时短路，跳过 isinstance 的 MRO 查找；str 子类仍然允许
+        bad_k = next((k for k in keys if type(k) is not str and not isinstance(k, str)), _SENTINEL)
+        if bad_k is not _SENTINEL:
+            raise FilePackError(f"file_map key must be str, got {type(bad_k)}: {bad_k}")
+
+        bad_k = next(
+            (k for k, v in zip(keys, vals) if type(v) is not str and not isinstance(v, str)), _SENTINEL
+        )
+        if bad_k is not _SENTINEL:
+            # 内容也可以改成支持 bytes/None 等，这里按需求严格 str
+            raise FilePackError(f"file_map value must be str, got {type(d[bad_k])}: {bad_k}")
+
+        return dict(zip(keys, vals))
 
     def _validate_project_name(self, project_name: str) -> None:
         """避免路径穿越/非法目录名。"""
         if not project_name or not isinstance(project_name, str):
             raise FilePackError("project_name must be a non-empty string.")
 
-        # 禁止路径分隔符，避免 project_name 变成多级路径
-        if "/" in project_name or "\\" in project_name:
-            raise FilePackError("project_name must not contain path separators (/ or \\).")
-
-        # 简单禁止 '..'
-        if ".." in project_name:
-            raise FilePackError("project_name must not contain '..'.")
+        # 禁止路径分隔符与 '..'，避免 project_name 变成多级路径或穿越
+        if _BAD_NAME.search(project_name):
+            raise FilePackError("project_name must not contain path separators (/ or \\) or '..'.")
 
-    def _sanitize_relpath(self, rel_path: str) -> Path:
+    def _sanitize_relpath(self, rel_path: str) -> PurePosixPath:
         """
-        将用户提供的相对路径转为安全的相对 Path：
-        - 禁止绝对路径
+        将用户提供的相对路径转为安全的相对 PurePosixPath：
+        - 禁止绝对路径/盘符
         - 禁止 '..' 路径穿越
+        - '\\' 统一视为分隔符
         """
-        p = Path(rel_path)
+        if not rel_path or _BAD_REL.search(rel_path):
+            raise FilePackError(f"Unsafe path in key: {rel_path}")
 
-        if p.is_absolute():
-            raise FilePackError(f"Absolute path not allowed in key: {rel_path}")
-
-        # 统一处理：分段检查
-        for part in p.parts:
-            if part in ("..", ""):
-                raise FilePackError(f"Unsafe path segment in key: {rel_path}")
+        p = PurePosixPath(rel_path.replace("\\", "/"))
+        # 如 "." 这类归一化后为空的路径
+        if not p.parts:
+            raise FilePackError(f"Unsafe path in key: {rel_path}")
 
         return p
 
+    def _check_path_conflict(
+        self,
+        safe_rel: PurePosixPath,
+        rel: str,
+        files: Set[PurePosixPath],
+        dirs: Set[PurePosixPath],
+    ) -> None:
+        """
+        检查 safe_rel 与已登记的路径是否冲突，并登记该路径：
+        - 如 "a/b.txt"、"./a/b.txt"、"a\\b.txt" 归一化后相同，禁止重复
+        - 如 "a" 与 "a/b"，同一路径不能既是文件又是目录
+        files/dirs 分别记录已出现的文件路径与其全部上级目录。
+        """
+        if safe_rel in files:
+            raise FilePackError(f"Duplicate path after normalization in key: {rel}")
+        if safe_rel in dirs:
+            raise FilePackError(f"Path is also used as a directory by another key: {rel}")
+
+        parents = safe_rel.parents[:-1]  # 去掉末尾的 "."
+        if any(parent in files for parent in parents):
+            raise FilePackError(f"Parent directory is also used as a file by another key: {rel}")
+
+        files.add(safe_rel)
+        dirs.update(parents)
+
     # ---------------------------
     # Filesystem Helpers
     # ---------------------------
@@ -172,17 +291,35 @@ class ProjectFilePacker:
     def _recreate_dir(self, path: Path) -> None:
         """若目录存在则删除重建，保证干净。"""
         if path.exists():
-            shutil.rmtree(path)
+            self._fast_rmtree(path)
         path.mkdir(parents=True, exist_ok=True)
 
-    def _safe_remove_dir(self, path: Path) -> None:
-        """安全删除目录（存在才删）。"""
-        try:
-            if path.exists():
-                shutil.rmtree(path)
-        except Exception:
-            # 清理失败不应影响主流程（zip 已经生成）
-            pass
+    def _fast_rmtree(self, path: Path) -> None:
+        """
+        基于 os.scandir 的非递归删除目录树：
+        - scandir 自带 d_type，is_dir(follow_symlinks=False) 无需额外 stat
+        - 显式栈代替递归，子项删完后再 rmdir 目录本身
+        - 符号链接只删除链接，不跟随；path 本身为符号链接时抛出 OSError
+        """
+        # 与 shutil.rmtree 一致：根目录本身是符号链接时拒绝，避免删除链接目标中的内容
+        if os.path.islink(path):
+            raise OSError(f"Cannot call rmtree on a symbolic link: {path}")
+
+        # 栈元素：(目录路径, 子项是否已处理)
+        stack = [(os.fspath(path), False)]
+        while stack:
+            dir_path, visited = stack.pop()
+            if visited:
+                os.rmdir(dir_path)
+                continue
+
+            stack.append((dir_path, True))
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, False))
+                    else:
+                        os.unlink(entry.path)
 
     def _write_files(self, root: Path, file_map: Dict[str, str]) -> None:
         """
@@ -190,38 +327,276 @@ class ProjectFilePacker:
         key: 相对路径/文件名
         value: 文件内容（str）
         """
+        # root 只 resolve 一次；_sanitize_relpath 已拒绝绝对路径与 '..'，
+        # 循环内只做词法层面的包含校验，不再逐个 resolve
+        root_resolved = root.resolve()
+
+        targets = []
+        files: Set[PurePosixPath] = set()
+        dirs: Set[PurePosixPath] = set()
         for rel, content in file_map.items():
             safe_rel = self._sanitize_relpath(rel)
-            target = (root / safe_rel).resolve()
+            assert not safe_rel.is_absolute()
+            target = root_resolved / safe_rel
 
-            # 防止 resolve 后跳出 root（双保险）
-            if not str(target).startswith(str(root.resolve()) + os.sep) and target != root.resolve():
+            # 防止拼接后跳出 root（双保险），按路径分段比较，不做字符串拼接
+            if target == root_resolved or not target.is_relative_to(root_resolved):
                 raise FilePackError(f"Path escapes project root: {rel}")
+            self._check_path_conflict(safe_rel, rel, files, dirs)
+            targets.append((target, content))
 
-            # 创建父目录并写文件
-            target.parent.mkdir(parents=True, exist_ok=True)
-            target.write_text(content, encoding="utf-8")
+        # 先按层级由浅到深一次性创建所有父目录，写文件时不再 mkdir
+        for d in sorted({target.parent for target, _ in targets}, key=lambda x: len(x.parts)):
+            os.makedirs(d, exist_ok=True)
+
+        for target, content in targets:
+            self._write_bytes(target, content.encode("utf-8"))
+
+    def _write_bytes(self, target: Path, data: bytes) -> None:
+        """
+        一次性写入已编码的内容，不经过 TextIOWrapper。
+        大文件整块写入时 BufferedWriter 无意义，直接用无缓冲 FileIO。
+        """
+        if len(data) < self.UNBUFFERED_WRITE_MIN:
+            with open(target, "wb") as f:
+                f.write(data)
+            return
+
+        with open(target, "wb", buffering=0) as f:
+            view = memoryview(data)
+            while view:
+                # 无缓冲写可能只写入部分数据
+                view = view[f.write(view):]
 
     # ---------------------------
     # Zip Helpers
     # ---------------------------
 
+    def _zip_from_map(self, file_map_dict: Dict[str, str], out_dir: Path, project_name: str) -> Path:
+        """直接从内存中的 file_map 写入 out_dir/project_name.zip，无需临时目录。"""
+        zip_path = (out_dir / f"{project_name}.zip").resolve()
+
+        # 先校验全部 key，避免中途失败留下残缺的 zip
+        # arcname 让 zip 内部路径从 project_name 开始
+        entries = []
+        files: Set[PurePosixPath] = set()
+        dirs: Set[PurePosixPath] = set()
+        for rel, content in file_map_dict.items():
+            safe_rel = self._sanitize_relpath(rel)
+            self._check_path_conflict(safe_rel, rel, files, dirs)
+            entries.append((f"{project_name}/{safe_rel}", content.encode("utf-8")))
+
+        # CRC 与大小在写出前已知，直接写入 local header：顺序写出，
+        # 不回写 header，也不需要 data descriptor。
+        # 预估大小取上限：STORED 与原始大小相同，DEFLATE 通常更小
+        est_size = sum(len(data) + 2 * len(arcname) for arcname, data in entries) + 100 * len(entries)
+        if self._use_parallel(entries):
+            records: Iterable[ZipRecord] = self._deflate_entries(entries)
+        else:
+            # 未开启并行时逐个压缩、逐个写出，不在内存中保留全部压缩结果
+            records = self._iter_records(entries)
+        with self._open_zip_stream(zip_path, est_size) as buf:
+            self._write_raw_zip(buf, records)
+
+        return zip_path
+
     def _make_zip(self, src_dir: Path, out_dir: Path, zip_name: str) -> Path:
         """将 src_dir 打包为 out_dir/zip_name，并返回 zip 路径。"""
         zip_path = (out_dir / zip_name).resolve()
 
+        with self._open_zip_stream(zip_path) as buf:
+            self._write_raw_zip(buf, self._iter_records(self._read_files(src_dir)))
+
+        return zip_path
+
+    def _read_files(self, src_dir: Path) -> Iterator[Tuple[str, bytes]]:
+        """逐个读取 src_dir 下的文件，产出 (arcname, 内容)。"""
+        for full_path, arcname in self._iter_files(src_dir):
+            with open(full_path, "rb") as f:
+                yield arcname, f.read()
+
+    def _iter_files(self, src_dir: Path) -> Iterator[Tuple[str, str]]:
+        """
+        基于 os.scandir 遍历 src_dir 下的所有文件，产出 (完整路径, arcname)。
+        scandir 自带 d_type，判断文件/目录无需额外 stat；
+        arcname 从 project_name 开始，随遍历直接拼接 POSIX 字符串，不做路径解析。
+        顺序与文件系统无关：每个目录内先按名称产出文件，再按名称深入子目录。
+        """
+        stack = [(str(src_dir), f"{src_dir.name}/")]
+        while stack:
+            dir_path, arc_prefix = stack.pop()
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+
+            sub_dirs = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    sub_dirs.append((entry.path, f"{arc_prefix}{entry.name}/"))
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path, arc_prefix + entry.name
+            # 栈为后进先出，逆序压入使子目录按名称顺序出栈
+            stack.extend(reversed(sub_dirs))
+
+    def _compress_type_for(self, size: int) -> int:
+        """按内容大小选择压缩方式：极小文件 STORED，其余 DEFLATED。"""
+        if size < self.ZIP_STORE_BELOW:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+    def _use_parallel(self, entries: List[Tuple[str, bytes]]) -> bool:
+        """是否走并行压缩：需开启且文件数足够。"""
+        return bool(self.parallel_workers) and len(entries) >= self.PARALLEL_MIN_ENTRIES
+
+    def _to_record(self, arcname: str, data: bytes, payload: Optional[bytes] = None) -> ZipRecord:
+        """构建 ZipRecord；payload 为已压缩好的 DEFLATE 流，未提供时在当前线程内压缩。"""
+        compress_type = self._compress_type_for(len(data))
+        if compress_type == zipfile.ZIP_STORED:
+            payload = data
+        elif payload is None:
+            payload = _raw_deflate(data, self.compress_level)
+        return arcname, len(data), zlib.crc32(data), compress_type, payload
+
+    def _iter_records(self, entries: Iterable[Tuple[str, bytes]]) -> Iterator[ZipRecord]:
+        """逐个压缩并产出 ZipRecord，同一时刻只持有一个压缩结果。"""
+        for arcname, data in entries:
+            yield self._to_record(arcname, data)
+
+    def _deflate_entries(self, entries: List[Tuple[str, bytes]]) -> List[ZipRecord]:
+        """
+        用线程/进程池并行压缩较大的文件（各自输出独立的 DEFLATE 流），
+        其余在当前线程内处理；最终由调用方在单一流中顺序写出。
+        """
+        deflate = partial(_raw_deflate, level=self.compress_level)
+        # 交给线程/进程池的下标与 _to_record 使用同一判断，按下标对应，避免错位
+        big_idx = [
+            i for i, (_, data) in enumerate(entries)
+            if self._compress_type_for(len(data)) == zipfile.ZIP_DEFLATED
+            and len(data) >= self.PARALLEL_MIN_SIZE
+        ]
+
+        big_payloads: Dict[int, bytes] = {}
+        if big_idx:
+            executor_cls = self.PARALLEL_EXECUTORS[self.parallel_backend]
+            with executor_cls(max_workers=self.parallel_workers) as executor:
+                payloads = executor.map(deflate, [entries[i][1] for i in big_idx], chunksize=8)
+                big_payloads = dict(zip(big_idx, payloads))
+
+        return [
+            self._to_record(arcname, data, big_payloads.get(i))
+            for i, (arcname, data) in enumerate(entries)
+        ]
+
+    def _write_raw_zip(self, fp: BinaryIO, records: Iterable[ZipRecord]) -> None:
+        """
+        将已压缩好的数据顺序写成 zip：逐个写 local file header + 数据，
+        最后写 central directory 与结束记录。全程只追加写，不回写 header。
+        - 固定 mtime（1980-01-01）与 0644 权限，同样的输入得到可复现的 zip
+        - 大小/偏移/文件数超限时写 zip64 扩展字段与 zip64 结束记录
+        records 可以是生成器，逐个消费。
+        """
+        central = []
+        count = 0
+        offset = 0
+        for arcname, size, crc, compress_type, payload in records:
+            try:
+                name = arcname.encode("ascii")
+                flags = 0
+            except UnicodeEncodeError:
+                name = arcname.encode("utf-8")
+                flags = 0x800
+            compress_size = len(payload)
+            version = 20 if compress_type == zipfile.ZIP_DEFLATED else 10
+
+            # local header：大小超限时放入 zip64 扩展字段
+            if size > _ZIP64_LIMIT or compress_size > _ZIP64_LIMIT:
+                local_extra = struct.pack("<HHQQ", 1, 16, size, compress_size)
+                local_sizes = (0xFFFFFFFF, 0xFFFFFFFF)
+                local_version = 45
+            else:
+                local_extra = b""
+                local_sizes = (compress_size, size)
+                local_version = version
+
+            fp.write(_LOCAL_HEADER.pack(
+                b"PK\x03\x04", local_version, flags, compress_type, _DOS_TIME, _DOS_DATE,
+                crc, *local_sizes, len(name), len(local_extra),
+            ))
+            fp.write(name)
+            fp.write(local_extra)
+            fp.write(payload)
+
+            # central directory：字段顺序为 原始大小、压缩大小、local header 偏移
+            zip64_fields = []
+            if size > _ZIP64_LIMIT or compress_size > _ZIP64_LIMIT:
+                zip64_fields += [size, compress_size]
+                size_fields = (0xFFFFFFFF, 0xFFFFFFFF)
+            else:
+                size_fields = (compress_size, size)
+            if offset > _ZIP64_LIMIT:
+                zip64_fields.append(offset)
+                offset_field = 0xFFFFFFFF
+            else:
+                offset_field = offset
+
+            if zip64_fields:
+                central_extra = struct.pack(f"<HH{len(zip64_fields)}Q", 1, 8 * len(zip64_fields), *zip64_fields)
+                central_version = 45
+            else:
+                central_extra = b""
+                central_version = version
+
+            central.append(_CENTRAL_HEADER.pack(
+                b"PK\x01\x02", (3 << 8) | max(central_version, 20), central_version, flags, compress_type,
+                _DOS_TIME, _DOS_DATE, crc, *size_fields, len(name), len(central_extra), 0, 0, 0,
+                0o644 << 16, offset_field,
+            ) + name + central_extra)
+            offset += _LOCAL_HEADER.size + len(name) + len(local_extra) + compress_size
+            count += 1
+
+        central_dir = b"".join(central)
+        fp.write(central_dir)
+
+        if count > _ZIP_FILECOUNT_LIMIT or offset > _ZIP64_LIMIT or len(central_dir) > _ZIP64_LIMIT:
+            zip64_end_offset = offset + len(central_dir)
+            fp.write(_ZIP64_END_RECORD.pack(
+                b"PK\x06\x06", 44, 45, 45, 0, 0, count, count, len(central_dir), offset,
+            ))
+            fp.write(_ZIP64_END_LOCATOR.pack(b"PK\x06\x07", 0, zip64_end_offset, 1))
+
+        fp.write(_END_RECORD.pack(
+            b"PK\x05\x06", 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+            min(len(central_dir), 0xFFFFFFFF), min(offset, 0xFFFFFFFF), 0,
+        ))
+
+    @contextmanager
+    def _open_zip_stream(self, zip_path: Path, est_size: int = 0) -> Iterator[io.BufferedWriter]:
+        """
+        以大缓冲区打开 zip 输出文件（同名 zip 已存在则覆盖）：
+        - 按 est_size 预分配磁盘空间（posix_fallocate，仅 Linux 等支持的平台），减少碎片
+        - 正常结束时截断到实际长度，去掉预分配多出的部分
+        - 写入过程中出错则删除该文件，不留下残缺/补零的 zip
+        """
         # 若同名 zip 已存在，覆盖
         if zip_path.exists():
             zip_path.unlink()
 
-        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            for file in src_dir.rglob("*"):
-                if file.is_file():
-                    # arcname 让 zip 内部路径从 project_name 开始
-                    arcname = file.relative_to(src_dir.parent)
-                    zf.write(file, arcname=str(arcname))
-
-        return zip_path
+        done = False
+        try:
+            with open(zip_path, "wb", buffering=0) as raw, \
+                    io.BufferedWriter(raw, buffer_size=self.ZIP_WRITE_BUF) as buf:
+                if est_size > 0 and hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(raw.fileno(), 0, est_size)
+                    except OSError:
+                        # 文件系统不支持预分配时忽略
+                        pass
+
+                yield buf
+                buf.truncate()
+            done = True
+        finally:
+            if not done:
+                zip_path.unlink(missing_ok=True)
 
     # ---------------------------
     # Storage Helpers (local demo)
@@ -230,6 +605,9 @@ class ProjectFilePacker:
         """将本地路径转为 file:// URL（示例用）。"""
         # Windows/Posix 都尽量兼容
         p = path.as_posix()
+        # 快路径：全部是 quote 不会转义的字符时，结果与 quote(p) 相同
+        if _URL_SAFE_PATH.fullmatch(p):
+            return "file://" + p
         return "file://" + quote(p)
 
 